@@ -0,0 +1,323 @@
+"""
+Geração em lote (offline) para catálogos de imagens
+
+Uso:
+    python batch.py fotos/ --mode interior --styles modern,scandinavian --room-type living_room
+    python batch.py entrada.jsonl --manifest resultados.jsonl --concurrency 8
+
+A entrada pode ser um diretório (todas as imagens JPG/PNG/WebP) ou um arquivo
+JSONL com um item por linha: {"image": "...", "style": "...", "room_type": "...",
+"garden_type": "...", "strength": 0.35, "mode": "...", "model": "..."}.
+
+Os resultados são gravados incrementalmente no manifesto (JSONL). Ao reiniciar,
+itens com status "succeeded" são pulados; itens com falha são refeitos.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from catalog import GARDEN_PROMPTS, ROOM_PROMPTS, STYLE_PROMPTS
+from config import settings
+from inference import inference
+from utils import (
+    process_pool,
+    validate_image,
+    optimize_image,
+    build_prompt_interior,
+    build_prompt_exterior,
+    build_prompt_garden,
+    build_input_interior,
+    build_input_exterior,
+    build_input_garden
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+# Campos que cada modo realmente usa (os demais não entram no id do item)
+MODE_FIELDS = {
+    "interior": ("room_type",),
+    "exterior": (),
+    "garden": ("garden_type", "strength")
+}
+
+# Modelo padrão de cada modo (igual aos endpoints da API)
+DEFAULT_MODELS = {
+    "interior": "flux-dev",
+    "exterior": "flux-canny-pro",
+    "garden": "flux-dev"
+}
+
+def preprocess_image(path: str, max_size_bytes: int) -> tuple[bytes, str]:
+    """
+    Lê, valida e otimiza uma imagem (executado no pool de processos)
+
+    Args:
+        path: Caminho da imagem
+        max_size_bytes: Tamanho máximo permitido em bytes
+
+    Returns:
+        (optimized_bytes, error_message)
+    """
+    try:
+        with open(path, "rb") as f:
+            image_bytes = f.read()
+    except OSError as e:
+        return b"", f"Erro ao ler arquivo: {e}"
+
+    is_valid, error_msg = validate_image(image_bytes, max_size_bytes)
+    if not is_valid:
+        return b"", error_msg
+
+    try:
+        return optimize_image(image_bytes), ""
+    except Exception as e:
+        return b"", f"Erro ao otimizar imagem: {e}"
+
+def build_prediction(item: dict, image) -> tuple[str, dict]:
+    """
+    Monta o prompt e os parâmetros do modelo para um item
+
+    Returns:
+        (model_name, input)
+    """
+    mode = item["mode"]
+    model_name = settings.MODELS[item["model"]]
+
+    if mode == "interior":
+        prompt = build_prompt_interior(item["style"], item["room_type"])
+        return model_name, build_input_interior(image, prompt)
+    if mode == "exterior":
+        prompt = build_prompt_exterior(item["style"])
+        return model_name, build_input_exterior(image, prompt)
+
+    prompt = build_prompt_garden(item["style"], item["garden_type"])
+    return model_name, build_input_garden(image, prompt, item["strength"])
+
+def item_id(item: dict) -> str:
+    """Identificador estável de um item (imagem + parâmetros usados pelo modo)"""
+    key = json.dumps(
+        [os.path.abspath(item["image"]), item["mode"], item["style"], item["model"]]
+        + [item[field] for field in MODE_FIELDS[item["mode"]]]
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+def validate_item(item: dict) -> None:
+    """
+    Rejeita ids desconhecidos antes de gastar uma predição
+
+    Os build_prompt_* caem silenciosamente em "modern"/"living room" para ids
+    desconhecidos; no lote isso geraria (e cobraria) um item com nome errado.
+
+    Raises:
+        ValueError: Parâmetro inválido
+    """
+    where = item["image"]
+    mode = item["mode"]
+    if not isinstance(item["style"], str) or item["style"].lower() not in STYLE_PROMPTS:
+        raise ValueError(f"Estilo inválido para {where}: {item['style']}")
+    if item["model"] not in settings.MODELS:
+        raise ValueError(f"Modelo inválido para {where}: {item['model']}")
+
+    if mode == "interior":
+        if not isinstance(item["room_type"], str) or item["room_type"].lower() not in ROOM_PROMPTS:
+            raise ValueError(f"Tipo de cômodo inválido para {where}: {item['room_type']}")
+    elif mode == "garden":
+        if not isinstance(item["garden_type"], str) or item["garden_type"].lower() not in GARDEN_PROMPTS:
+            raise ValueError(f"Tipo de jardim inválido para {where}: {item['garden_type']}")
+        strength = item["strength"]
+        if isinstance(strength, bool) or not isinstance(strength, (int, float)) or not 0.0 <= strength <= 1.0:
+            raise ValueError(f"Strength deve estar entre 0.0 e 1.0 para {where}: {strength}")
+
+def load_items(source: str, args: argparse.Namespace) -> list[dict]:
+    """Expande o diretório ou manifesto de entrada em itens (imagem x estilo)"""
+    defaults = {
+        "mode": args.mode,
+        "room_type": args.room_type,
+        "garden_type": args.garden_type,
+        "strength": args.strength,
+        "model": args.model
+    }
+    styles = [style.strip() for style in args.styles.split(",") if style.strip()]
+
+    entries = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                entries.append({"image": os.path.join(source, name)})
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    entry = json.loads(line)
+                    if not isinstance(entry, dict) or not isinstance(entry.get("image"), str):
+                        raise ValueError(f"Linha {line_number} de {source}: campo \"image\" obrigatório")
+                    entry["image"] = os.path.join(base_dir, entry["image"])
+                    entries.append(entry)
+
+    items = []
+    for entry in entries:
+        entry_styles = [entry["style"]] if "style" in entry else styles
+        for style in entry_styles:
+            item = {**defaults, **entry, "style": style}
+            if item["mode"] not in DEFAULT_MODELS:
+                raise ValueError(f"Modo inválido para {entry['image']}: {item['mode']}")
+            item["model"] = item["model"] or DEFAULT_MODELS[item["mode"]]
+            validate_item(item)
+            item["id"] = item_id(item)
+            items.append(item)
+
+    return items
+
+def load_completed(manifest_path: str) -> set[str]:
+    """Ids já concluídos com sucesso no manifesto"""
+    completed = set()
+    if not os.path.exists(manifest_path):
+        return completed
+
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Linha truncada por interrupção
+            if record.get("status") == "succeeded":
+                completed.add(record["id"])
+
+    return completed
+
+class ManifestWriter:
+    """Grava um registro por linha assim que cada item termina"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, item: dict, status: str, output_url: str = None, error: str = None,
+              processing_time: float = 0.0) -> None:
+        record = {
+            "id": item["id"],
+            "image": item["image"],
+            "mode": item["mode"],
+            "style": item["style"],
+            "room_type": item["room_type"] if item["mode"] == "interior" else None,
+            "garden_type": item["garden_type"] if item["mode"] == "garden" else None,
+            "model": item["model"],
+            "status": status,
+            "output_url": output_url,
+            "error": error,
+            "processing_time": round(processing_time, 2)
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+async def run_batch(items: list[dict], writer: ManifestWriter, workers: int, concurrency: int) -> dict:
+    """
+    Pré-processa cada imagem uma vez no pool de processos e executa as
+    predições com no máximo `concurrency` chamadas simultâneas
+    """
+    loop = asyncio.get_running_loop()
+    # inference.run usa asyncio.to_thread: o executor padrão precisa de `concurrency` threads
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    semaphore = asyncio.Semaphore(concurrency)
+    # Limita as imagens otimizadas em memória (pré-processamento + predições pendentes)
+    image_slots = asyncio.Semaphore(concurrency + workers)
+    counts = {"succeeded": 0, "failed": 0}
+
+    # Agrupar itens por imagem para otimizar cada foto uma única vez
+    by_image: dict[str, list[dict]] = {}
+    for item in items:
+        by_image.setdefault(item["image"], []).append(item)
+
+    async def predict(item: dict, optimized_bytes: bytes) -> None:
+        async with semaphore:
+            start_time = time.time()
+            try:
+                model_name, input = build_prediction(item, io.BytesIO(optimized_bytes))
+                output = await inference.run(model_name, input=input)
+                output_url = str(output[0]) if isinstance(output, list) else str(output)
+                writer.write(item, "succeeded", output_url=output_url,
+                             processing_time=time.time() - start_time)
+                counts["succeeded"] += 1
+                print(f"[ok] {item['image']} ({item['style']}) -> {output_url}")
+            except Exception as e:
+                writer.write(item, "failed", error=str(e), processing_time=time.time() - start_time)
+                counts["failed"] += 1
+                print(f"[erro] {item['image']} ({item['style']}): {e}", file=sys.stderr)
+
+    async def process_image(path: str, image_items: list[dict], pool: ProcessPoolExecutor) -> None:
+        async with image_slots:
+            optimized_bytes, error_msg = await loop.run_in_executor(
+                pool, preprocess_image, path, settings.MAX_IMAGE_SIZE_BYTES
+            )
+            if error_msg:
+                for item in image_items:
+                    writer.write(item, "failed", error=error_msg)
+                    counts["failed"] += 1
+                print(f"[erro] {path}: {error_msg}", file=sys.stderr)
+                return
+
+            await asyncio.gather(*(predict(item, optimized_bytes) for item in image_items))
+
+    with process_pool(workers) as pool:
+        await asyncio.gather(*(
+            process_image(path, image_items, pool) for path, image_items in by_image.items()
+        ))
+
+    return counts
+
+def positive_int(value: str) -> int:
+    """Tipo do argparse para inteiros >= 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"deve ser >= 1: {value}")
+    return number
+
+def main():
+    parser = argparse.ArgumentParser(description="Geração em lote de variações de estilo")
+    parser.add_argument("source", help="Diretório de imagens ou manifesto de entrada (JSONL)")
+    parser.add_argument("--manifest", default="batch_manifest.jsonl", help="Manifesto de resultados (JSONL)")
+    parser.add_argument("--mode", choices=sorted(DEFAULT_MODELS), default="interior", help="Tipo de geração")
+    parser.add_argument("--styles", default="modern", help="Estilos separados por vírgula")
+    parser.add_argument("--room-type", default="living_room", help="Tipo de cômodo (modo interior)")
+    parser.add_argument("--garden-type", default="garden", help="Tipo de área (modo garden)")
+    parser.add_argument("--strength", type=float, default=0.35, help="Força da transformação (modo garden)")
+    parser.add_argument("--model", default=None, help="Modelo a usar (padrão depende do modo)")
+    parser.add_argument("--workers", type=positive_int, default=os.cpu_count() or 1, help="Processos de pré-processamento")
+    parser.add_argument("--concurrency", type=positive_int, default=4, help="Predições simultâneas")
+    args = parser.parse_args()
+
+    if not settings.REPLICATE_API_TOKEN:
+        parser.error("REPLICATE_API_TOKEN não configurado")
+
+    try:
+        items = load_items(args.source, args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    completed = load_completed(args.manifest)
+    pending = [item for item in items if item["id"] not in completed]
+    print(f"{len(items)} itens, {len(items) - len(pending)} já concluídos, {len(pending)} pendentes")
+
+    if not pending:
+        return
+
+    writer = ManifestWriter(args.manifest)
+    inference.start(min_connections=args.concurrency)
+    try:
+        counts = asyncio.run(run_batch(pending, writer, args.workers, args.concurrency))
+    finally:
+        inference.close()
+        writer.close()
+
+    print(f"Concluído: {counts['succeeded']} sucesso, {counts['failed']} falha")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark de cold start: tempo de import do app, tempo até a primeira requisição
+e custo da primeira geração
+
+Uso:
+    python benchmark_startup.py [--runs 5]
+
+Cada execução roda em um processo Python novo (sem cache de módulos) para
+os modos STARTUP_MODE=eager e STARTUP_MODE=lazy.
+
+A primeira geração (POST /api/redesign-interior) passa por validate_image,
+optimize_image e inference.start() com o client.run do Replicate simulado,
+para mostrar onde o modo lazy paga os imports adiados.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Executado em um subprocesso limpo; imprime os tempos em JSON
+_PROBE = """
+import json, struct, time, zlib
+
+def make_png(size=64):
+    # PNG RGB gerado só com a stdlib (não carrega o Pillow antes da medição)
+    raw = b"".join(b"\\x00" + bytes((x * 4 % 256, 128, 200)) * size for x in range(size))
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\\x89PNG\\r\\n\\x1a\\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+png = make_png()
+
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter() - t0
+
+# Simula apenas a chamada de rede; inference.start() continua real
+from inference import InferencePool
+_client_for = InferencePool._client_for
+def _mocked_client_for(self, model_name):
+    client = _client_for(self, model_name)
+    client.run = lambda *args, **kwargs: ["https://replicate.delivery/benchmark/output.webp"]
+    return client
+InferencePool._client_for = _mocked_client_for
+
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    t_startup = time.perf_counter() - t0
+    response = client.get("/health")
+    t_first = time.perf_counter() - t0
+
+    t_gen = time.perf_counter()
+    generation = client.post(
+        "/api/redesign-interior",
+        files={"image": ("room.png", png, "image/png")},
+        data={"style": "modern", "room_type": "bedroom"}
+    )
+    t_generation = time.perf_counter() - t_gen
+
+print(json.dumps({
+    "import_s": t_import,
+    "startup_s": t_startup,
+    "first_request_s": t_first,
+    "first_generation_s": t_generation,
+    "status": response.status_code,
+    "generation_success": generation.json().get("success")
+}))
+"""
+
+def run_probe(mode: str) -> dict:
+    env = dict(os.environ, STARTUP_MODE=mode)
+    # Sem warm-up de rede: mede apenas o custo local de inicialização
+    env.setdefault("REPLICATE_WARM_CONNECTIONS", "0")
+    env.setdefault("REPLICATE_API_TOKEN", "r8_benchmark")
+    env.setdefault("MIRROR_RESULTS", "false")
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    if not sample["generation_success"]:
+        raise RuntimeError(f"Geração simulada falhou no modo {mode}")
+    return sample
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de cold start da API")
+    parser.add_argument("--runs", type=int, default=5, help="Execuções por modo")
+    args = parser.parse_args()
+
+    print(f"{'modo':<8}{'import (ms)':>14}{'startup (ms)':>14}{'1ª req (ms)':>14}{'1ª geração (ms)':>18}")
+    for mode in ("eager", "lazy"):
+        samples = [run_probe(mode) for _ in range(args.runs)]
+        import_ms = statistics.median(s["import_s"] for s in samples) * 1000
+        startup_ms = statistics.median(s["startup_s"] for s in samples) * 1000
+        first_ms = statistics.median(s["first_request_s"] for s in samples) * 1000
+        generation_ms = statistics.median(s["first_generation_s"] for s in samples) * 1000
+        print(f"{mode:<8}{import_ms:>14.1f}{startup_ms:>14.1f}{first_ms:>14.1f}{generation_ms:>18.1f}")
+
+if __name__ == "__main__":
+    main()
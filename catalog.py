@@ -0,0 +1,221 @@
+"""
+Catálogo de estilos, cômodos, jardins e modelos
+
+Fonte única para os endpoints de listagem e para os prompts em utils.py.
+As respostas são serializadas uma única vez no import (bytes + ETag forte).
+"""
+import hashlib
+import json
+from typing import NamedTuple
+
+from config import settings
+
+# Estilos: nome/descrição exibidos no app + descrição usada no prompt
+STYLES = [
+    {
+        "id": "eclectic",
+        "name": "Eclético",
+        "description": "Mistura de estilos diversos",
+        "prompt": "eclectic, mixed styles, diverse elements, unique combinations, artistic"
+    },
+    {
+        "id": "modern",
+        "name": "Moderno",
+        "description": "Linhas limpas e cores neutras",
+        "prompt": "modern, clean lines, neutral colors, contemporary furniture"
+    },
+    {
+        "id": "minimalist",
+        "name": "Minimalista",
+        "description": "Simples e despojado",
+        "prompt": "minimalist, simple, white and wood tones, uncluttered"
+    },
+    {
+        "id": "contemporary",
+        "name": "Contemporâneo",
+        "description": "Sofisticado e elegante",
+        "prompt": "contemporary, sleek, sophisticated, mixed materials"
+    },
+    {
+        "id": "scandinavian",
+        "name": "Escandinavo",
+        "description": "Aconchegante e natural",
+        "prompt": "scandinavian, cozy, natural materials, bright and airy"
+    },
+    {
+        "id": "mediterranean",
+        "name": "Mediterrâneo",
+        "description": "Cores quentes e texturas naturais",
+        "prompt": "mediterranean, warm colors, terracotta, natural textures, coastal vibes"
+    },
+    {
+        "id": "industrial",
+        "name": "Industrial",
+        "description": "Tijolos expostos e metal",
+        "prompt": "industrial style, exposed brick, metal fixtures, concrete, raw materials"
+    },
+    {
+        "id": "bohemian",
+        "name": "Boêmio",
+        "description": "Colorido e eclético",
+        "prompt": "bohemian, colorful, eclectic, plants, textured fabrics, relaxed"
+    },
+    {
+        "id": "rustic",
+        "name": "Rústico",
+        "description": "Madeira e tons quentes",
+        "prompt": "rustic, wooden elements, warm tones, natural textures"
+    },
+    {
+        "id": "japanese_design",
+        "name": "Japonês",
+        "description": "Zen e minimalista",
+        "prompt": "japanese design, zen, minimalist, natural wood, tatami, shoji screens"
+    },
+    {
+        "id": "arabic",
+        "name": "Árabe",
+        "description": "Ornamentado e luxuoso",
+        "prompt": "arabic, ornate patterns, rich colors, arches, mosaic tiles, luxurious textiles"
+    },
+    {
+        "id": "futuristic",
+        "name": "Futurista",
+        "description": "High-tech e moderno",
+        "prompt": "futuristic, high-tech, sleek, metallic, LED lighting, cutting-edge design"
+    },
+    {
+        "id": "luxurious",
+        "name": "Luxuoso",
+        "description": "Opulento e sofisticado",
+        "prompt": "luxurious, opulent, rich materials, elegant, high-end furnishings, sophisticated"
+    },
+    {
+        "id": "retro",
+        "name": "Retrô",
+        "description": "Nostálgico e vintage",
+        "prompt": "retro, vintage inspired, bold colors, nostalgic elements, mid-century influences"
+    },
+    {
+        "id": "professional",
+        "name": "Profissional",
+        "description": "Corporativo e organizado",
+        "prompt": "professional, corporate, clean, organized, modern office aesthetic"
+    },
+    {
+        "id": "vintage",
+        "name": "Vintage",
+        "description": "Clássico e atemporal",
+        "prompt": "vintage, antique, classic pieces, timeless, traditional craftsmanship"
+    },
+    {
+        "id": "eco_friendly",
+        "name": "Eco-Friendly",
+        "description": "Sustentável e natural",
+        "prompt": "eco-friendly, sustainable materials, natural, green, organic, recycled elements"
+    },
+    {
+        "id": "gothic",
+        "name": "Gótico",
+        "description": "Dramático e escuro",
+        "prompt": "gothic, dark colors, dramatic, ornate details, Victorian influences, moody"
+    },
+    {
+        "id": "traditional",
+        "name": "Tradicional",
+        "description": "Clássico e elegante",
+        "prompt": "traditional, classic, elegant, rich colors"
+    },
+    {
+        "id": "coastal",
+        "name": "Costeiro",
+        "description": "Inspirado na praia",
+        "prompt": "coastal, beach inspired, light colors, natural light"
+    },
+    {
+        "id": "midcentury",
+        "name": "Mid-Century",
+        "description": "Retrô dos anos 50-60",
+        "prompt": "mid-century modern, retro, clean lines, organic shapes"
+    }
+]
+
+# Tipos de cômodo
+ROOM_TYPES = [
+    {"id": "living_room", "name": "Sala de Estar", "prompt": "living room"},
+    {"id": "bedroom", "name": "Quarto", "prompt": "bedroom"},
+    {"id": "bathroom", "name": "Banheiro", "prompt": "bathroom"},
+    {"id": "kitchen", "name": "Cozinha", "prompt": "kitchen"},
+    {"id": "dining_room", "name": "Sala de Jantar", "prompt": "dining room"},
+    {"id": "home_office", "name": "Home Office", "prompt": "home office"},
+    {"id": "study_room", "name": "Sala de Estudos", "prompt": "study room"},
+    {"id": "office", "name": "Escritório", "prompt": "office"},
+    {"id": "coworking", "name": "Coworking", "prompt": "coworking space"}
+]
+
+# Tipos de jardim/área externa
+GARDEN_TYPES = [
+    {"id": "garden", "name": "Jardim", "prompt": "garden"},
+    {"id": "backyard", "name": "Quintal", "prompt": "backyard"},
+    {"id": "front_yard", "name": "Jardim Frontal", "prompt": "front yard"},
+    {"id": "patio", "name": "Pátio", "prompt": "patio"},
+    {"id": "terrace", "name": "Terraço", "prompt": "terrace"},
+    {"id": "rooftop", "name": "Cobertura/Rooftop", "prompt": "rooftop garden"}
+]
+
+# Metadados exibidos para os modelos (nome no Replicate fica em settings.MODELS)
+MODEL_INFO = {
+    "flux-schnell": {
+        "name": "Flux Schnell",
+        "description": "Rápido e eficiente",
+        "speed": "10-15s",
+        "cost": "$0.001"
+    },
+    "flux-dev": {
+        "name": "Flux Dev",
+        "description": "Alta qualidade (RECOMENDADO)",
+        "speed": "25-35s",
+        "cost": "$0.003"
+    },
+    "flux-canny-pro": {
+        "name": "Flux Canny Pro",
+        "description": "Edge detection para preservar estrutura (EXTERIOR)",
+        "speed": "45-50s",
+        "cost": "$0.05"
+    }
+}
+
+# Descrições usadas na construção dos prompts
+STYLE_PROMPTS = {style["id"]: style["prompt"] for style in STYLES}
+ROOM_PROMPTS = {room["id"]: room["prompt"] for room in ROOM_TYPES}
+GARDEN_PROMPTS = {garden["id"]: garden["prompt"] for garden in GARDEN_TYPES}
+
+class SerializedResponse(NamedTuple):
+    """Corpo JSON pré-serializado e seu ETag forte"""
+    body: bytes
+    etag: str
+
+def serialize(payload: dict) -> SerializedResponse:
+    """
+    Serializa o payload para bytes e calcula um ETag forte a partir do conteúdo
+
+    Args:
+        payload: Dicionário da resposta
+
+    Returns:
+        SerializedResponse(body, etag)
+    """
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return SerializedResponse(body, etag)
+
+def _public(items: list[dict]) -> list[dict]:
+    """Remove campos internos (prompt) da resposta pública"""
+    return [{key: value for key, value in item.items() if key != "prompt"} for item in items]
+
+STYLES_RESPONSE = serialize({"styles": _public(STYLES)})
+ROOM_TYPES_RESPONSE = serialize({"room_types": _public(ROOM_TYPES)})
+GARDEN_TYPES_RESPONSE = serialize({"garden_types": _public(GARDEN_TYPES)})
+MODELS_RESPONSE = serialize({
+    "models": [{"id": model_id, **MODEL_INFO[model_id]} for model_id in settings.MODELS]
+})
@@ -2,23 +2,58 @@
 Configurações da aplicação
 """
 import os
-from dotenv import load_dotenv
 
-# Carregar variáveis de ambiente
-load_dotenv()
+# Carregar variáveis de ambiente (python-dotenv só é importado se existir um .env)
+ENV_FILE = os.getenv("ENV_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+if os.path.exists(ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE)
 
 class Settings:
     # Replicate
     REPLICATE_API_TOKEN = os.getenv("REPLICATE_API_TOKEN")
 
+    # Pool de conexões com o Replicate
+    # run() é bloqueante e roda em threads: o pool nunca fica abaixo do número
+    # de threads do executor padrão do asyncio (min(32, cpu + 4))
+    REPLICATE_MAX_CONNECTIONS = int(os.getenv("REPLICATE_MAX_CONNECTIONS", 100))
+    REPLICATE_MAX_KEEPALIVE = int(os.getenv("REPLICATE_MAX_KEEPALIVE", 10))
+    REPLICATE_KEEPALIVE_EXPIRY = float(os.getenv("REPLICATE_KEEPALIVE_EXPIRY", 60))
+    REPLICATE_HTTP2 = os.getenv("REPLICATE_HTTP2", "false").lower() == "true"  # Requer pacote h2
+    REPLICATE_CONNECT_TIMEOUT = float(os.getenv("REPLICATE_CONNECT_TIMEOUT", 5))
+    REPLICATE_READ_TIMEOUT = float(os.getenv("REPLICATE_READ_TIMEOUT", 30))
+    REPLICATE_POOL_TIMEOUT = float(os.getenv("REPLICATE_POOL_TIMEOUT", 30))  # Espera por conexão livre
+    REPLICATE_WARM_CONNECTIONS = int(os.getenv("REPLICATE_WARM_CONNECTIONS", 2))
+    REPLICATE_WARM_TIMEOUT = float(os.getenv("REPLICATE_WARM_TIMEOUT", 3))
+
     # Servidor
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", 8000))
 
+    # Inicialização: "lazy" adia o pool do Replicate até a primeira predição,
+    # "eager" cria e aquece as conexões no startup
+    STARTUP_MODE = os.getenv("STARTUP_MODE", "eager").lower()
+
     # Limites
     MAX_IMAGE_SIZE_MB = int(os.getenv("MAX_IMAGE_SIZE_MB", 10))
     MAX_IMAGE_SIZE_BYTES = MAX_IMAGE_SIZE_MB * 1024 * 1024
 
+    # Cache HTTP dos endpoints de catálogo (segundos)
+    CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", 3600))
+
+    # Espelhamento local das saídas (indexado pela URL de entrega + miniaturas)
+    MIRROR_RESULTS = os.getenv("MIRROR_RESULTS", "false").lower() == "true"
+    MEDIA_DIR = os.getenv("MEDIA_DIR", "media")
+    MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", 2))
+    MEDIA_SIZES = {
+        "preview": int(os.getenv("MEDIA_PREVIEW_SIZE", 768)),
+        "thumbnail": int(os.getenv("MEDIA_THUMBNAIL_SIZE", 256))
+    }
+
+    # Profiler sob demanda (endpoint desativado se DEBUG_TOKEN não estiver definido)
+    DEBUG_TOKEN = os.getenv("DEBUG_TOKEN")
+    PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", 60))
+
     # CORS
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 
@@ -32,4 +67,13 @@ class Settings:
     # Modelo padrão (flux-dev conforme solicitado)
     DEFAULT_MODEL = "flux-dev"
 
+    # Timeout de leitura por modelo (segundos). Vale para cada chamada HTTP
+    # (criação e cada polling da predição), NÃO para o tempo total da geração:
+    # o replicate faz polling até a predição terminar
+    MODEL_READ_TIMEOUTS = {
+        "flux-schnell": float(os.getenv("FLUX_SCHNELL_READ_TIMEOUT", 30)),
+        "flux-dev": float(os.getenv("FLUX_DEV_READ_TIMEOUT", 60)),
+        "flux-canny-pro": float(os.getenv("FLUX_CANNY_PRO_READ_TIMEOUT", 90))
+    }
+
 settings = Settings()
@@ -0,0 +1,242 @@
+"""
+Cliente HTTP compartilhado para o backend de inferência (Replicate)
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Optional
+
+from config import settings
+from profiler import request_tracker
+
+if TYPE_CHECKING:
+    import httpx
+    import replicate
+
+
+class InferencePool:
+    """
+    Mantém um único pool de conexões HTTP para o Replicate
+
+    Todos os modelos compartilham o mesmo transporte (pool, keep-alive, HTTP/2);
+    cada modelo recebe apenas o seu próprio timeout de leitura.
+    """
+
+    def __init__(self):
+        self._transport: Optional["httpx.HTTPTransport"] = None
+        self._clients: dict[str, "replicate.Client"] = {}
+        self._warm_client: Optional["replicate.Client"] = None
+        self._max_connections = 0
+        self._http: Optional["httpx.Client"] = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._in_flight: dict[str, int] = {}
+        self._total_requests = 0
+        self._total_errors = 0
+        self._started_at: Optional[float] = None
+        self._warmed_connections = 0
+
+    @property
+    def started(self) -> bool:
+        return self._transport is not None
+
+    def start(self, min_connections: int = 0) -> None:
+        """
+        Cria o transporte compartilhado e um cliente por modelo
+
+        Args:
+            min_connections: Mínimo de conexões no pool (ex: concorrência do batch)
+        """
+        with self._start_lock:
+            if not self.started:
+                self._start(min_connections)
+
+    def _start(self, min_connections: int) -> None:
+        # Imports pesados adiados até o primeiro uso (cold start mais rápido)
+        import httpx
+        import replicate
+
+        # Cada thread do executor padrão pode segurar uma conexão durante o run()
+        default_threads = min(32, (os.cpu_count() or 1) + 4)
+        max_connections = max(settings.REPLICATE_MAX_CONNECTIONS, default_threads, min_connections)
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=settings.REPLICATE_MAX_KEEPALIVE,
+            keepalive_expiry=settings.REPLICATE_KEEPALIVE_EXPIRY
+        )
+        transport = httpx.HTTPTransport(
+            http2=settings.REPLICATE_HTTP2,
+            limits=limits
+        )
+
+        clients = {}
+        for model_key, model_name in settings.MODELS.items():
+            read_timeout = settings.MODEL_READ_TIMEOUTS.get(model_key, settings.REPLICATE_READ_TIMEOUT)
+            timeout = httpx.Timeout(
+                connect=settings.REPLICATE_CONNECT_TIMEOUT,
+                read=read_timeout,
+                write=read_timeout,
+                pool=settings.REPLICATE_POOL_TIMEOUT
+            )
+            clients[model_name] = replicate.Client(
+                api_token=settings.REPLICATE_API_TOKEN,
+                timeout=timeout,
+                transport=transport
+            )
+
+        # Warm-up com timeout curto: Replicate lento não pode segurar o startup
+        warm_client = replicate.Client(
+            api_token=settings.REPLICATE_API_TOKEN,
+            timeout=httpx.Timeout(settings.REPLICATE_WARM_TIMEOUT),
+            transport=transport
+        )
+
+        # Cliente genérico para baixar saídas (replicate.delivery) pelo mesmo pool
+        self._http = httpx.Client(
+            transport=transport,
+            timeout=httpx.Timeout(
+                settings.REPLICATE_READ_TIMEOUT,
+                connect=settings.REPLICATE_CONNECT_TIMEOUT,
+                pool=settings.REPLICATE_POOL_TIMEOUT
+            ),
+            follow_redirects=True
+        )
+
+        # Publicar o transporte por último: `started` só fica True com os clientes prontos
+        self._clients = clients
+        self._warm_client = warm_client
+        self._max_connections = max_connections
+        self._transport = transport
+        self._started_at = time.time()
+
+    def warm(self) -> int:
+        """
+        Abre conexões antecipadamente (TLS + keep-alive) consultando o modelo padrão
+
+        Returns:
+            Número de conexões aquecidas com sucesso
+        """
+        count = settings.REPLICATE_WARM_CONNECTIONS
+        if not self.started or not settings.REPLICATE_API_TOKEN or count <= 0:
+            return 0
+
+        model_name = settings.MODELS[settings.DEFAULT_MODEL]
+        client = self._warm_client
+
+        def _ping(_: int) -> bool:
+            try:
+                client.models.get(model_name)
+                return True
+            except Exception:
+                return False
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            self._warmed_connections = sum(executor.map(_ping, range(count)))
+
+        return self._warmed_connections
+
+    def close(self) -> None:
+        """Fecha todas as conexões do pool"""
+        if self._transport is not None:
+            self._transport.close()
+        self._transport = None
+        self._clients = {}
+        self._warm_client = None
+        self._http = None
+
+    def _client_for(self, model_name: str) -> "replicate.Client":
+        if not self.started:
+            self.start()
+        client = self._clients.get(model_name)
+        if client is None:
+            client = self._clients[settings.MODELS[settings.DEFAULT_MODEL]]
+        return client
+
+    def _run(self, model_name: str, input: dict[str, Any]) -> Any:
+        client = self._client_for(model_name)
+
+        with self._lock:
+            self._in_flight[model_name] = self._in_flight.get(model_name, 0) + 1
+            self._total_requests += 1
+
+        try:
+            # Atribui esta thread à requisição (filtro slow_ms do profiler)
+            with request_tracker.thread_span():
+                return client.run(model_name, input=input)
+        except Exception:
+            with self._lock:
+                self._total_errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight[model_name] -= 1
+
+    async def run(self, model_name: str, input: dict[str, Any]) -> Any:
+        """
+        Executa uma predição sem bloquear o event loop
+
+        Args:
+            model_name: Nome completo do modelo no Replicate
+            input: Parâmetros do modelo
+
+        Returns:
+            Saída retornada pelo Replicate
+        """
+        return await asyncio.to_thread(self._run, model_name, input)
+
+    def _download(self, url: str) -> bytes:
+        if not self.started:
+            self.start()
+        response = self._http.get(url)
+        response.raise_for_status()
+        return response.content
+
+    async def download(self, url: str) -> bytes:
+        """
+        Baixa uma saída do Replicate reutilizando o pool de conexões
+
+        Args:
+            url: URL de entrega retornada pela predição
+
+        Returns:
+            Bytes do arquivo
+        """
+        return await asyncio.to_thread(self._download, url)
+
+    def stats(self) -> dict:
+        """Métricas de utilização do pool de conexões"""
+        # Internos do httpx/httpcore (HTTPTransport._pool.connections, is_idle());
+        # acesso direto para falhar de forma visível se mudarem (test_inference.py)
+        connections = []
+        if self._transport is not None:
+            connections = list(self._transport._pool.connections)
+
+        idle = sum(1 for conn in connections if conn.is_idle())
+        active = len(connections) - idle
+
+        with self._lock:
+            in_flight = {name: count for name, count in self._in_flight.items() if count}
+            total_requests = self._total_requests
+            total_errors = self._total_errors
+
+        return {
+            "started": self.started,
+            "uptime_seconds": round(time.time() - self._started_at, 2) if self._started_at else 0.0,
+            "http2": settings.REPLICATE_HTTP2,
+            "max_connections": self._max_connections,
+            "max_keepalive_connections": settings.REPLICATE_MAX_KEEPALIVE,
+            "warmed_connections": self._warmed_connections,
+            "open_connections": len(connections),
+            "active_connections": active,
+            "idle_connections": idle,
+            "utilization": round(active / max(1, self._max_connections), 3),
+            "in_flight": in_flight,
+            "total_requests": total_requests,
+            "total_errors": total_errors
+        }
+
+
+inference = InferencePool()
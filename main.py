@@ -1,35 +1,70 @@
 """
 API FastAPI para Interior Design com IA
 """
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import BackgroundTasks, FastAPI, File, UploadFile, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
+import asyncio
+import hmac
+import mimetypes
+from contextlib import asynccontextmanager
 from typing import Optional
-import replicate
 import os
 import tempfile
 import time
+from catalog import (
+    SerializedResponse,
+    STYLES_RESPONSE,
+    ROOM_TYPES_RESPONSE,
+    GARDEN_TYPES_RESPONSE,
+    MODELS_RESPONSE
+)
 from config import settings
+from inference import inference
+from media import media_failed, media_path, schedule_mirror, start as start_media, shutdown as shutdown_media
 from models import GenerateResponse, HealthResponse
+from profiler import ProfilerBusyError, RequestTrackingMiddleware, request_tracker, sample
 from utils import (
+    load_pil,
+    etag_matches,
+    parse_range,
     validate_image,
     optimize_image,
     build_prompt_interior,
     build_prompt_exterior,
     build_prompt_garden,
     build_prompt_reference,
+    build_input_interior,
+    build_input_exterior,
+    build_input_garden,
     STYLE_DESCRIPTIONS,
     ROOM_DESCRIPTIONS
 )
 
-# Configurar Replicate
-os.environ["REPLICATE_API_TOKEN"] = settings.REPLICATE_API_TOKEN
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cria e aquece o pool de conexões com o Replicate; fecha no shutdown"""
+    warm_task = None
+    if settings.MIRROR_RESULTS:
+        # Pool de processos criado aqui (forkserver), antes das threads de I/O
+        start_media()
+    if settings.STARTUP_MODE != "lazy":
+        load_pil()
+        inference.start()
+        # Warm-up em segundo plano: não atrasa o readiness do worker
+        warm_task = asyncio.create_task(asyncio.to_thread(inference.warm))
+    yield
+    if warm_task is not None:
+        await warm_task
+    inference.close()
+    shutdown_media()
 
 # Criar app FastAPI
 app = FastAPI(
     title="Interior AI API",
     description="API para redesign de ambientes usando IA",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -41,6 +76,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Duração das requisições para o filtro slow_ms do profiler (só com debug ativo)
+if settings.DEBUG_TOKEN:
+    app.add_middleware(RequestTrackingMiddleware)
+
 @app.get("/", response_model=dict)
 async def root():
     """Endpoint raiz"""
@@ -54,6 +93,7 @@ async def root():
             "garden_design": "POST /api/garden-design",
             "reference_style": "POST /api/reference-style",
             "health": "GET /health",
+            "media": "GET /media/{digest}/{name}",
             "styles": "GET /api/styles",
             "room_types": "GET /api/room-types",
             "garden_types": "GET /api/garden-types",
@@ -72,11 +112,34 @@ async def health_check():
         replicate_configured=replicate_configured
     )
 
+def require_debug_token(request: Request) -> None:
+    """
+    Protege endpoints operacionais (métricas, profiler)
+
+    404 se DEBUG_TOKEN não estiver definido; 401 se X-Debug-Token não corresponder
+    """
+    if not settings.DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("x-debug-token", "")
+    if not hmac.compare_digest(token.encode(), settings.DEBUG_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token de debug inválido")
+
+@app.get("/metrics", response_model=dict)
+async def metrics(request: Request):
+    """
+    Métricas de utilização do pool de conexões com o Replicate
+
+    Requer o cabeçalho X-Debug-Token igual a DEBUG_TOKEN
+    """
+    require_debug_token(request)
+    return inference.stats()
+
 # ============================================
 # ENDPOINT 1: REDESIGN INTERIOR
 # ============================================
 @app.post("/api/redesign-interior", response_model=GenerateResponse)
 async def redesign_interior(
+    background_tasks: BackgroundTasks,
     image: UploadFile = File(..., description="Imagem do ambiente atual"),
     style: str = Form(..., description="Estilo desejado"),
     room_type: str = Form(..., description="Tipo de cômodo"),
@@ -114,23 +177,19 @@ async def redesign_interior(
             model_name = settings.MODELS.get(model, settings.MODELS[settings.DEFAULT_MODEL])
 
             with open(tmp_path, "rb") as image_file:
-                output = replicate.run(
+                output = await inference.run(
                     model_name,
-                    input={
-                        "image": image_file,
-                        "prompt": prompt,
-                        "num_inference_steps": 35,  # Aumentado para melhor qualidade/definição
-                        "guidance_scale": 9.5,  # Aumentado para mais fidelidade ao prompt fotorrealista
-                        "strength": 0.6  # Fixo: balanceado para máximo realismo
-                    }
+                    input=build_input_interior(image_file, prompt)
                 )
 
             output_url = str(output[0]) if isinstance(output, list) else str(output)
+            media = schedule_mirror(output_url, background_tasks)
             processing_time = time.time() - start_time
 
             return GenerateResponse(
                 success=True,
                 output_url=output_url,
+                **media,
                 style=style,
                 room_type=room_type,
                 model_used=model,
@@ -156,6 +215,7 @@ async def redesign_interior(
 # ============================================
 @app.post("/api/design-exterior", response_model=GenerateResponse)
 async def design_exterior(
+    background_tasks: BackgroundTasks,
     image: UploadFile = File(..., description="Imagem da fachada/exterior atual"),
     style: str = Form(..., description="Estilo arquitetônico desejado"),
     model: str = Form("flux-canny-pro", description="Modelo a usar")
@@ -192,23 +252,19 @@ async def design_exterior(
             model_name = settings.MODELS.get(model, settings.MODELS[settings.DEFAULT_MODEL])
 
             with open(tmp_path, "rb") as image_file:
-                output = replicate.run(
+                output = await inference.run(
                     model_name,
-                    input={
-                        "control_image": image_file,  # Canny usa control_image
-                        "prompt": prompt,
-                        "steps": 40,  # Passos de difusão (15-50, default 50)
-                        "guidance": 7.5,  # Máximo para preservar estrutura (1-100)
-                        "output_format": "jpg"
-                    }
+                    input=build_input_exterior(image_file, prompt)
                 )
 
             output_url = str(output[0]) if isinstance(output, list) else str(output)
+            media = schedule_mirror(output_url, background_tasks)
             processing_time = time.time() - start_time
 
             return GenerateResponse(
                 success=True,
                 output_url=output_url,
+                **media,
                 style=style,
                 room_type=None,
                 model_used=model,
@@ -234,6 +290,7 @@ async def design_exterior(
 # ============================================
 @app.post("/api/garden-design", response_model=GenerateResponse)
 async def garden_design(
+    background_tasks: BackgroundTasks,
     image: UploadFile = File(..., description="Imagem do jardim/área externa atual"),
     style: str = Form(..., description="Estilo de jardim desejado"),
     garden_type: str = Form("garden", description="Tipo de área (garden, backyard, front_yard, patio, etc)"),
@@ -273,23 +330,19 @@ async def garden_design(
             model_name = settings.MODELS.get(model, settings.MODELS[settings.DEFAULT_MODEL])
 
             with open(tmp_path, "rb") as image_file:
-                output = replicate.run(
+                output = await inference.run(
                     model_name,
-                    input={
-                        "image": image_file,
-                        "prompt": prompt,
-                        "num_inference_steps": 28,
-                        "guidance_scale": 15.0,  # MUITO ALTO para forçar fotorrealismo
-                        "strength": strength  # Default: 0.35 (ultra conservador)
-                    }
+                    input=build_input_garden(image_file, prompt, strength)
                 )
 
             output_url = str(output[0]) if isinstance(output, list) else str(output)
+            media = schedule_mirror(output_url, background_tasks)
             processing_time = time.time() - start_time
 
             return GenerateResponse(
                 success=True,
                 output_url=output_url,
+                **media,
                 style=style,
                 room_type=garden_type,
                 model_used=model,
@@ -315,6 +368,7 @@ async def garden_design(
 # ============================================
 @app.post("/api/reference-style", response_model=GenerateResponse)
 async def reference_style(
+    background_tasks: BackgroundTasks,
     base_image: UploadFile = File(..., description="Imagem do ambiente base"),
     reference_image: UploadFile = File(..., description="Imagem de referência de estilo"),
     room_type: str = Form(..., description="Tipo de cômodo"),
@@ -385,7 +439,7 @@ async def reference_style(
 
             with open(base_path, "rb") as base_file:
                 # Primeira passada: aplicar transformação base
-                output = replicate.run(
+                output = await inference.run(
                     model_name,
                     input={
                         "image": base_file,
@@ -397,11 +451,13 @@ async def reference_style(
                 )
 
             output_url = str(output[0]) if isinstance(output, list) else str(output)
+            media = schedule_mirror(output_url, background_tasks)
             processing_time = time.time() - start_time
 
             return GenerateResponse(
                 success=True,
                 output_url=output_url,
+                **media,
                 style="reference_style",
                 room_type=room_type,
                 model_used=model,
@@ -428,94 +484,137 @@ async def reference_style(
 # ============================================
 # ENDPOINTS DE LISTAGEM
 # ============================================
+def catalog_response(request: Request, serialized: SerializedResponse) -> Response:
+    """Resposta pré-serializada com ETag, Cache-Control e suporte a 304"""
+    headers = {
+        "ETag": serialized.etag,
+        "Cache-Control": f"public, max-age={settings.CATALOG_MAX_AGE}"
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), serialized.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=serialized.body, media_type="application/json", headers=headers)
+
 @app.get("/api/styles")
-async def get_styles():
+async def get_styles(request: Request):
     """Retorna lista completa de estilos disponíveis"""
-    return {
-        "styles": [
-            {"id": "eclectic", "name": "Eclético", "description": "Mistura de estilos diversos"},
-            {"id": "modern", "name": "Moderno", "description": "Linhas limpas e cores neutras"},
-            {"id": "minimalist", "name": "Minimalista", "description": "Simples e despojado"},
-            {"id": "contemporary", "name": "Contemporâneo", "description": "Sofisticado e elegante"},
-            {"id": "scandinavian", "name": "Escandinavo", "description": "Aconchegante e natural"},
-            {"id": "mediterranean", "name": "Mediterrâneo", "description": "Cores quentes e texturas naturais"},
-            {"id": "industrial", "name": "Industrial", "description": "Tijolos expostos e metal"},
-            {"id": "bohemian", "name": "Boêmio", "description": "Colorido e eclético"},
-            {"id": "rustic", "name": "Rústico", "description": "Madeira e tons quentes"},
-            {"id": "japanese_design", "name": "Japonês", "description": "Zen e minimalista"},
-            {"id": "arabic", "name": "Árabe", "description": "Ornamentado e luxuoso"},
-            {"id": "futuristic", "name": "Futurista", "description": "High-tech e moderno"},
-            {"id": "luxurious", "name": "Luxuoso", "description": "Opulento e sofisticado"},
-            {"id": "retro", "name": "Retrô", "description": "Nostálgico e vintage"},
-            {"id": "professional", "name": "Profissional", "description": "Corporativo e organizado"},
-            {"id": "vintage", "name": "Vintage", "description": "Clássico e atemporal"},
-            {"id": "eco_friendly", "name": "Eco-Friendly", "description": "Sustentável e natural"},
-            {"id": "gothic", "name": "Gótico", "description": "Dramático e escuro"},
-            {"id": "traditional", "name": "Tradicional", "description": "Clássico e elegante"},
-            {"id": "coastal", "name": "Costeiro", "description": "Inspirado na praia"},
-            {"id": "midcentury", "name": "Mid-Century", "description": "Retrô dos anos 50-60"}
-        ]
-    }
+    return catalog_response(request, STYLES_RESPONSE)
 
 @app.get("/api/room-types")
-async def get_room_types():
+async def get_room_types(request: Request):
     """Retorna lista completa de tipos de cômodos disponíveis"""
-    return {
-        "room_types": [
-            {"id": "living_room", "name": "Sala de Estar"},
-            {"id": "bedroom", "name": "Quarto"},
-            {"id": "bathroom", "name": "Banheiro"},
-            {"id": "kitchen", "name": "Cozinha"},
-            {"id": "dining_room", "name": "Sala de Jantar"},
-            {"id": "home_office", "name": "Home Office"},
-            {"id": "study_room", "name": "Sala de Estudos"},
-            {"id": "office", "name": "Escritório"},
-            {"id": "coworking", "name": "Coworking"}
-        ]
-    }
+    return catalog_response(request, ROOM_TYPES_RESPONSE)
 
 @app.get("/api/garden-types")
-async def get_garden_types():
+async def get_garden_types(request: Request):
     """Retorna lista de tipos de jardim/área externa"""
-    return {
-        "garden_types": [
-            {"id": "garden", "name": "Jardim"},
-            {"id": "backyard", "name": "Quintal"},
-            {"id": "front_yard", "name": "Jardim Frontal"},
-            {"id": "patio", "name": "Pátio"},
-            {"id": "terrace", "name": "Terraço"},
-            {"id": "rooftop", "name": "Cobertura/Rooftop"}
-        ]
-    }
+    return catalog_response(request, GARDEN_TYPES_RESPONSE)
 
 @app.get("/api/models")
-async def get_models():
+async def get_models(request: Request):
     """Retorna lista de modelos de IA disponíveis"""
-    return {
-        "models": [
-            {
-                "id": "flux-schnell",
-                "name": "Flux Schnell",
-                "description": "Rápido e eficiente",
-                "speed": "10-15s",
-                "cost": "$0.001"
-            },
-            {
-                "id": "flux-dev",
-                "name": "Flux Dev",
-                "description": "Alta qualidade (RECOMENDADO)",
-                "speed": "25-35s",
-                "cost": "$0.003"
-            },
-            {
-                "id": "flux-canny-pro",
-                "name": "Flux Canny Pro",
-                "description": "Edge detection para preservar estrutura (EXTERIOR)",
-                "speed": "45-50s",
-                "cost": "$0.05"
-            }
-        ]
+    return catalog_response(request, MODELS_RESPONSE)
+
+# ============================================
+# DEBUG: PROFILER POR AMOSTRAGEM
+# ============================================
+@app.get("/debug/profile")
+async def debug_profile(
+    request: Request,
+    seconds: float = Query(10.0, gt=0, description="Duração da amostragem"),
+    interval_ms: float = Query(10.0, ge=1, le=1000, description="Intervalo entre amostras (ms)"),
+    slow_ms: Optional[float] = Query(None, gt=0, description="Manter apenas threads de requisições mais lentas que isso (ms)"),
+    idle: bool = Query(False, description="Incluir threads ociosas")
+):
+    """
+    Amostra as pilhas do worker por N segundos e retorna collapsed stacks
+    (compatível com flamegraph.pl e speedscope)
+
+    Com slow_ms, mantém só as amostras do event loop e das threads que
+    executavam predições (InferencePool._run) de requisições mais lentas que o
+    limite, durante cada uma (inclusive as já em andamento no início)
+
+    Requer o cabeçalho X-Debug-Token igual a DEBUG_TOKEN
+    """
+    require_debug_token(request)
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"Máximo permitido: {settings.PROFILE_MAX_SECONDS}s")
+
+    # A própria chamada dura a sessão inteira: não pode contar como requisição lenta
+    tracking_id = getattr(request.state, "tracking_id", None)
+    if tracking_id is not None:
+        request_tracker.forget(tracking_id)
+
+    slow_threshold = slow_ms / 1000 if slow_ms is not None else None
+    try:
+        collapsed, sample_count = await asyncio.to_thread(
+            sample, seconds, interval_ms / 1000, slow_threshold, idle
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    filename = f"profile-{int(time.time())}.collapsed"
+    return Response(
+        content=collapsed,
+        media_type="text/plain",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+            "X-Profile-Samples": str(sample_count)
+        }
+    )
+
+# ============================================
+# RESULTADOS ESPELHADOS
+# ============================================
+def read_file_range(path: str, start: int, length: int) -> bytes:
+    """Lê um trecho do arquivo"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+@app.get("/media/{digest}/{name}")
+async def get_media(digest: str, name: str, request: Request):
+    """
+    Serve resultados espelhados localmente (original, preview, thumbnail)
+
+    A chave é o hash da URL de entrega, que o Replicate gera única por
+    predição: o conteúdo de uma chave nunca muda, daí cache longo "immutable",
+    ETag e requisições Range. Retorna 404 enquanto o espelhamento em segundo
+    plano não terminou e 410 se ele falhou
+    """
+    path = media_path(digest, name)
+    if path is None:
+        if media_failed(digest):
+            raise HTTPException(status_code=410, detail="Espelhamento falhou; use output_url")
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+
+    etag = f'"{digest[:32]}-{name}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes"
     }
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+
+    if range_header and (not if_range or if_range == etag):
+        size = os.path.getsize(path)
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+        if byte_range is not None:
+            start, end = byte_range
+            content = await asyncio.to_thread(read_file_range, path, start, end - start + 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            return Response(content=content, status_code=206, media_type=media_type, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers)
 
 if __name__ == "__main__":
     import uvicorn
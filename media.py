@@ -0,0 +1,205 @@
+"""
+Espelhamento local das saídas (armazenamento indexado pela URL de entrega + miniaturas)
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Callable, Optional
+
+from config import settings
+from inference import inference
+from utils import load_pil, open_image, process_pool
+
+# Formato detectado pelo Pillow -> extensão do original armazenado
+ORIGINAL_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+# Marcador gravado no diretório quando o espelhamento falha (contém o erro)
+FAILURE_MARKER = "failed"
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def media_key(output_url: str) -> str:
+    """
+    Chave de armazenamento de uma saída (SHA-256 da URL de entrega)
+
+    Conhecida antes do download, então as URLs locais podem ir na resposta
+    enquanto o espelhamento roda em segundo plano.
+    """
+    return hashlib.sha256(output_url.encode("utf-8")).hexdigest()
+
+def media_dir(digest: str) -> str:
+    """Diretório de um arquivo no armazenamento (media/ab/abcd...)"""
+    return os.path.join(settings.MEDIA_DIR, digest[:2], digest)
+
+def media_urls(digest: str) -> dict:
+    """Campos de GenerateResponse com as URLs locais"""
+    base_url = f"/media/{digest}"
+    return {
+        "local_url": f"{base_url}/original",
+        "preview_url": f"{base_url}/preview.jpg",
+        "thumbnail_url": f"{base_url}/thumbnail.jpg"
+    }
+
+def media_path(digest: str, name: str) -> Optional[str]:
+    """
+    Caminho local de um arquivo espelhado já existente
+
+    Args:
+        digest: Chave de armazenamento
+        name: "original" ou <variante>.jpg (ex: thumbnail.jpg)
+
+    Returns:
+        Caminho do arquivo, ou None se o nome for inválido ou o arquivo não existir
+    """
+    if not DIGEST_PATTERN.match(digest):
+        return None
+
+    directory = media_dir(digest)
+    if name == "original":
+        for ext in ORIGINAL_EXTENSIONS.values():
+            path = os.path.join(directory, f"original{ext}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    if name not in {f"{variant}.jpg" for variant in settings.MEDIA_SIZES}:
+        return None
+    path = os.path.join(directory, name)
+    return path if os.path.exists(path) else None
+
+def media_failed(digest: str) -> bool:
+    """Indica se o último espelhamento desta chave falhou"""
+    return bool(DIGEST_PATTERN.match(digest)) and os.path.exists(
+        os.path.join(media_dir(digest), FAILURE_MARKER)
+    )
+
+def _write_atomic(path: str, write: Callable[[BinaryIO], None]) -> None:
+    """Grava em arquivo temporário no mesmo diretório e renomeia"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def store_original(digest: str, data: bytes) -> str:
+    """
+    Grava o original com a extensão do formato real do conteúdo
+
+    Returns:
+        Caminho do original
+
+    Raises:
+        ValueError: Conteúdo não é JPEG/PNG/WebP
+    """
+    try:
+        image_format = open_image(data).format
+    except Exception as e:
+        raise ValueError(f"Saída inválida: {e}")
+    if image_format not in ORIGINAL_EXTENSIONS:
+        raise ValueError(f"Formato não suportado: {image_format}")
+
+    directory = media_dir(digest)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"original{ORIGINAL_EXTENSIONS[image_format]}")
+    if not os.path.exists(path):
+        _write_atomic(path, lambda f: f.write(data))
+    return path
+
+def make_derivatives(original_path: str, sizes: dict[str, int]) -> None:
+    """
+    Gera as variantes redimensionadas (JPEG) ao lado do original
+
+    Executado no pool de processos para não ocupar o event loop.
+
+    Args:
+        original_path: Caminho do original no armazenamento
+        sizes: Nome da variante -> dimensão máxima
+    """
+    Image = load_pil()
+    with open(original_path, "rb") as f:
+        original = open_image(f.read())
+    original.load()
+    if original.mode != "RGB":
+        original = original.convert("RGB")
+
+    directory = os.path.dirname(original_path)
+    for variant, max_dimension in sizes.items():
+        path = os.path.join(directory, f"{variant}.jpg")
+        if os.path.exists(path):
+            continue
+        img = original.copy()
+        img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        _write_atomic(path, lambda f: img.save(f, format="JPEG", quality=85, optimize=True))
+
+def start() -> None:
+    """Cria o pool de processos das miniaturas (chamado no lifespan)"""
+    global _pool
+    if _pool is None:
+        _pool = process_pool(settings.MEDIA_WORKERS)
+
+def shutdown() -> None:
+    """Encerra o pool de processos das miniaturas"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+async def mirror_output(output_url: str) -> None:
+    """
+    Baixa a saída uma vez, grava o original e gera as variantes
+
+    Executado em segundo plano. Uma falha é registrada no log e num marcador
+    no diretório da chave, para que GET /media responda 410 em vez de 404
+    indefinidamente; chamar de novo para a mesma URL refaz o espelhamento e
+    remove o marcador.
+
+    Args:
+        output_url: URL de entrega do Replicate
+    """
+    if _pool is None:
+        return
+
+    digest = media_key(output_url)
+    marker = os.path.join(media_dir(digest), FAILURE_MARKER)
+    try:
+        if os.path.exists(marker):
+            os.unlink(marker)
+        data = await inference.download(output_url)
+        original_path = await asyncio.to_thread(store_original, digest, data)
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_pool, make_derivatives, original_path, settings.MEDIA_SIZES)
+    except Exception as e:
+        logger.exception("Falha ao espelhar %s (chave %s)", output_url, digest)
+        try:
+            os.makedirs(media_dir(digest), exist_ok=True)
+            _write_atomic(marker, lambda f: f.write(f"{type(e).__name__}: {e}\n".encode("utf-8")))
+        except OSError:
+            logger.exception("Falha ao gravar o marcador de erro de %s", digest)
+
+def schedule_mirror(output_url: str, background_tasks) -> dict:
+    """
+    Agenda o espelhamento após a resposta e retorna as URLs locais
+
+    Args:
+        output_url: URL de entrega do Replicate
+        background_tasks: BackgroundTasks da requisição
+
+    Returns:
+        Campos de GenerateResponse (vazio se o espelhamento estiver desativado)
+    """
+    if not settings.MIRROR_RESULTS or _pool is None:
+        return {}
+
+    background_tasks.add_task(mirror_output, output_url)
+    return media_urls(media_key(output_url))
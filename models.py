@@ -15,6 +15,9 @@ class GenerateResponse(BaseModel):
     """Modelo para resposta de geração"""
     success: bool
     output_url: Optional[str] = None
+    local_url: Optional[str] = None
+    preview_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
     style: Optional[str] = None
     room_type: Optional[str] = None
     model_used: Optional[str] = None
@@ -0,0 +1,241 @@
+"""
+Profiler por amostragem sob demanda (formato collapsed stacks / flamegraph)
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+class ProfilerBusyError(Exception):
+    """Já existe uma sessão de profiling em andamento"""
+
+# Frames folha de threads paradas, por (sufixo do arquivo, função): só a
+# stdlib conta, um wait() de biblioteca (ex: Prediction.wait) não é ocioso
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("concurrent/futures/thread.py", "_worker"),
+    ("selectors.py", "select"),
+}
+
+# Requisição rastreada do contexto atual (propaga para asyncio.to_thread)
+current_request: ContextVar[Optional[int]] = ContextVar("current_request", default=None)
+
+# (thread, início, fim) em que uma thread trabalhou para uma requisição
+Span = tuple[int, float, float]
+
+class RequestTracker:
+    """
+    Registra o início de toda requisição, as threads que trabalharam para ela
+    e, durante uma sessão filtrada por lentidão, a janela de cada uma
+
+    Sempre guardar o início (um insert/pop em dict por requisição) permite
+    incluir requisições lentas que já estavam em andamento quando a sessão
+    começou.
+    """
+
+    def __init__(self):
+        self.active = False
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        # id -> (início, [[thread, início, fim ou None], ...])
+        self._open: dict[int, tuple[float, list]] = {}
+        self._finished: list[tuple[float, float, list]] = []
+
+    def start(self) -> None:
+        with self._lock:
+            self._finished = []
+            self.active = True
+
+    def stop(self) -> list[tuple[float, float, list[Span]]]:
+        """
+        Encerra a sessão
+
+        Returns:
+            (início, fim, spans) de cada requisição; as ainda abertas terminam
+            agora e cada span é limitado ao fim da sua requisição
+        """
+        now = time.perf_counter()
+        with self._lock:
+            self.active = False
+            requests = self._finished + [(started, now, spans) for started, spans in list(self._open.values())]
+            self._finished = []
+        return [
+            (started, ended, [
+                (thread_id, span_start, min(span_end if span_end is not None else ended, ended))
+                for thread_id, span_start, span_end in list(spans)
+            ])
+            for started, ended, spans in requests
+        ]
+
+    def request_started(self) -> int:
+        request_id = next(self._ids)
+        self._open[request_id] = (time.perf_counter(), [])
+        return request_id
+
+    @contextmanager
+    def thread_span(self, request_id: Optional[int] = None):
+        """
+        Associa a thread atual a uma requisição enquanto o bloco executa
+
+        Sem request_id, usa a requisição do contexto (current_request); fora
+        de uma requisição rastreada não faz nada.
+        """
+        if request_id is None:
+            request_id = current_request.get()
+        request = self._open.get(request_id) if request_id is not None else None
+        if request is None:
+            yield
+            return
+
+        span = [threading.get_ident(), time.perf_counter(), None]
+        request[1].append(span)
+        try:
+            yield
+        finally:
+            span[2] = time.perf_counter()
+
+    def forget(self, request_id: int) -> None:
+        """Descarta uma requisição (ex: a própria chamada de profiling)"""
+        self._open.pop(request_id, None)
+
+    def request_finished(self, request_id: int) -> None:
+        request = self._open.pop(request_id, None)
+        if request is not None and self.active:
+            started, spans = request
+            with self._lock:
+                self._finished.append((started, time.perf_counter(), spans))
+
+request_tracker = RequestTracker()
+
+class RequestTrackingMiddleware:
+    """
+    Middleware ASGI puro que alimenta o request_tracker
+
+    O fim da requisição é o último chunk da resposta (background tasks não
+    contam). A thread do event loop fica associada à requisição e o id vai em
+    current_request para que o trabalho enviado a threads (InferencePool._run)
+    também seja atribuído. Registrado apenas quando DEBUG_TOKEN está definido.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = request_tracker.request_started()
+        scope.setdefault("state", {})["tracking_id"] = request_id
+        token = current_request.set(request_id)
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                request_tracker.request_finished(request_id)
+
+        try:
+            with request_tracker.thread_span(request_id):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            request_tracker.request_finished(request_id)
+            current_request.reset(token)
+
+_session_lock = threading.Lock()
+
+def _frame_label(code) -> str:
+    # ';' separa frames no formato collapsed
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+def _is_idle(code) -> bool:
+    filename = code.co_filename.replace(os.sep, "/")
+    return any(
+        code.co_name == name and filename.endswith("/" + suffix)
+        for suffix, name in IDLE_FRAMES
+    )
+
+def _stack(frame, thread_name: str, labels: dict) -> tuple[str, ...]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        label = labels.get(code)
+        if label is None:
+            label = labels[code] = _frame_label(code)
+        stack.append(label)
+        frame = frame.f_back
+    stack.append(thread_name)
+    return tuple(reversed(stack))
+
+def sample(seconds: float, interval: float, slow_threshold: Optional[float] = None,
+           include_idle: bool = False) -> tuple[str, int]:
+    """
+    Amostra as pilhas de todas as threads do worker por `seconds` segundos
+
+    Args:
+        seconds: Duração da sessão
+        interval: Intervalo entre amostras (segundos)
+        slow_threshold: Se informado, mantém apenas amostras das threads que
+            trabalhavam para requisições mais lentas que este limite (o event
+            loop e as threads de InferencePool._run), durante cada uma (segundos)
+        include_idle: Mantém threads paradas (executor ocioso, event loop em select)
+
+    Returns:
+        (collapsed_stacks, sample_count)
+
+    Raises:
+        ProfilerBusyError: Outra sessão já está em andamento
+    """
+    if not _session_lock.acquire(blocking=False):
+        raise ProfilerBusyError("Profiling já em andamento")
+
+    try:
+        own_id = threading.get_ident()
+        labels: dict = {}
+        idle_codes: dict = {}
+        samples: list[tuple[int, float, tuple[str, ...]]] = []
+
+        if slow_threshold is not None:
+            request_tracker.start()
+        try:
+            deadline = time.perf_counter() + seconds
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    if not include_idle:
+                        idle = idle_codes.get(frame.f_code)
+                        if idle is None:
+                            idle = idle_codes[frame.f_code] = _is_idle(frame.f_code)
+                        if idle:
+                            continue
+                    samples.append((thread_id, now, _stack(frame, names.get(thread_id, str(thread_id)), labels)))
+                time.sleep(interval)
+        finally:
+            windows = request_tracker.stop() if slow_threshold is not None else None
+
+        if windows is not None:
+            slow_spans: dict[int, list[tuple[float, float]]] = {}
+            for started, ended, spans in windows:
+                if ended - started >= slow_threshold:
+                    for thread_id, span_start, span_end in spans:
+                        slow_spans.setdefault(thread_id, []).append((span_start, span_end))
+            samples = [
+                (thread_id, taken_at, stack) for thread_id, taken_at, stack in samples
+                if any(start <= taken_at <= end for start, end in slow_spans.get(thread_id, ()))
+            ]
+
+        counts = Counter(stack for _, _, stack in samples)
+        lines = [f"{';'.join(stack)} {count}" for stack, count in counts.most_common()]
+        return "\n".join(lines) + ("\n" if lines else ""), len(samples)
+    finally:
+        _session_lock.release()
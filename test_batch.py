@@ -0,0 +1,107 @@
+"""
+Testes da expansão de itens, validação e retomada do batch
+"""
+import argparse
+import json
+
+import pytest
+
+import batch
+
+def make_args(**overrides) -> argparse.Namespace:
+    values = {
+        "mode": "interior",
+        "room_type": "living_room",
+        "garden_type": "garden",
+        "strength": 0.35,
+        "model": None,
+        "styles": "modern,gothic"
+    }
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+@pytest.fixture
+def photos(tmp_path):
+    directory = tmp_path / "fotos"
+    directory.mkdir()
+    for name in ("a.jpg", "b.PNG", "notas.txt"):
+        (directory / name).write_bytes(b"")
+    return directory
+
+def write_jsonl(path, entries):
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries), encoding="utf-8")
+    return str(path)
+
+def test_load_items_directory(photos):
+    items = batch.load_items(str(photos), make_args())
+    assert [(item["image"].rsplit("/", 1)[-1], item["style"]) for item in items] == [
+        ("a.jpg", "modern"), ("a.jpg", "gothic"), ("b.PNG", "modern"), ("b.PNG", "gothic")
+    ]
+    assert all(item["model"] == "flux-dev" for item in items)
+
+def test_load_items_jsonl_defaults(tmp_path):
+    source = write_jsonl(tmp_path / "entrada.jsonl", [
+        {"image": "a.jpg", "mode": "garden", "style": "rustic", "strength": 0.5},
+        {"image": "b.jpg", "mode": "exterior"}
+    ])
+    items = batch.load_items(source, make_args())
+
+    assert items[0]["image"] == str(tmp_path / "a.jpg")
+    assert (items[0]["mode"], items[0]["strength"], items[0]["model"]) == ("garden", 0.5, "flux-dev")
+    assert [item["style"] for item in items[1:]] == ["modern", "gothic"]
+    assert items[1]["model"] == "flux-canny-pro"
+
+def test_item_id_ignores_fields_unused_by_mode(photos):
+    exterior = batch.load_items(str(photos), make_args(mode="exterior"))
+    changed = batch.load_items(str(photos), make_args(mode="exterior", room_type="kitchen", strength=0.9))
+    assert [item["id"] for item in exterior] == [item["id"] for item in changed]
+
+    interior = batch.load_items(str(photos), make_args())
+    other_room = batch.load_items(str(photos), make_args(room_type="kitchen"))
+    assert interior[0]["id"] != other_room[0]["id"]
+
+@pytest.mark.parametrize("overrides", [
+    {"mode": "rooftop"},
+    {"styles": "modern,nao_existe"},
+    {"room_type": "garagem"},
+    {"model": "sdxl"},
+    {"mode": "garden", "garden_type": "floresta"},
+    {"mode": "garden", "strength": 1.5},
+])
+def test_load_items_rejects_invalid_params(photos, overrides):
+    with pytest.raises(ValueError):
+        batch.load_items(str(photos), make_args(**overrides))
+
+@pytest.mark.parametrize("entry", [{"style": "modern"}, {"image": 3}, {"image": "a.jpg", "mode": "garden", "strength": "alta"}])
+def test_load_items_rejects_invalid_jsonl(tmp_path, entry):
+    source = write_jsonl(tmp_path / "entrada.jsonl", [entry])
+    with pytest.raises(ValueError):
+        batch.load_items(source, make_args())
+
+def test_resume_skips_succeeded_and_retries_failed(photos, tmp_path):
+    items = batch.load_items(str(photos), make_args())
+    manifest = tmp_path / "manifesto.jsonl"
+
+    writer = batch.ManifestWriter(str(manifest))
+    writer.write(items[0], "succeeded", output_url="https://replicate.delivery/a")
+    writer.write(items[1], "failed", error="timeout")
+    writer.close()
+    # Linha truncada (processo interrompido no meio da escrita)
+    with open(manifest, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": items[2]["id"], "status": "succeeded"})[:20])
+
+    completed = batch.load_completed(str(manifest))
+    assert completed == {items[0]["id"]}
+
+    # Reexecução com os mesmos parâmetros: só o item concluído é pulado
+    restarted = batch.load_items(str(photos), make_args())
+    pending = [item for item in restarted if item["id"] not in completed]
+    assert [item["id"] for item in pending] == [item["id"] for item in items[1:]]
+
+def test_load_completed_missing_manifest(tmp_path):
+    assert batch.load_completed(str(tmp_path / "nao_existe.jsonl")) == set()
+
+@pytest.mark.parametrize("value", ["0", "-2"])
+def test_positive_int_rejects_zero(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        batch.positive_int(value)
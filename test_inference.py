@@ -0,0 +1,52 @@
+"""
+Testes das métricas do pool (dependem de internos do httpx/httpcore)
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("replicate")
+
+from inference import InferencePool
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: a conexão volta ao pool
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_stats_before_start():
+    stats = InferencePool().stats()
+    assert stats["started"] is False
+    assert stats["open_connections"] == 0
+
+def test_stats_counts_pooled_connections(server):
+    pool = InferencePool()
+    pool.start()
+    try:
+        assert pool._download(server) == b"ok"
+
+        stats = pool.stats()
+        assert stats["open_connections"] == 1
+        assert stats["idle_connections"] == 1
+        assert stats["active_connections"] == 0
+        assert stats["max_connections"] >= 1
+    finally:
+        pool.close()
@@ -0,0 +1,147 @@
+"""
+Testes de parse_range, do endpoint GET /media (206, 416, If-Range, 304) e do
+marcador de falha do espelhamento (410)
+"""
+import asyncio
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config import settings
+import media
+from inference import inference
+from media import media_dir, media_key
+from utils import parse_range
+
+CONTENT = bytes(range(100))
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=50-500", (50, 99)),
+    ("bytes= 2 - 4", (2, 4)),
+    ("bytes=5-1", None),
+    ("bytes=0-1,4-5", None),
+    ("items=0-1", None),
+    ("bytes=a-b", None),
+    ("bytes=-", None),
+    ("bytes", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(CONTENT)) == expected
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=150-200", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, len(CONTENT))
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    import main
+
+    monkeypatch.setattr(settings, "MEDIA_DIR", str(tmp_path))
+    # Sem context manager: o lifespan (pool do Replicate) não é executado
+    return TestClient(main.app)
+
+@pytest.fixture
+def digest():
+    digest = media_key("https://replicate.delivery/test/output.webp")
+    os.makedirs(media_dir(digest))
+    with open(os.path.join(media_dir(digest), "original.webp"), "wb") as f:
+        f.write(CONTENT)
+    return digest
+
+def test_get_media_full(client, digest):
+    response = client.get(f"/media/{digest}/original")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+
+def test_get_media_range(client, digest):
+    response = client.get(f"/media/{digest}/original", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == "bytes 10-19/100"
+
+def test_get_media_suffix_range(client, digest):
+    response = client.get(f"/media/{digest}/original", headers={"Range": "bytes=-5"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-5:]
+
+def test_get_media_unsatisfiable_range(client, digest):
+    response = client.get(f"/media/{digest}/original", headers={"Range": "bytes=200-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
+
+def test_get_media_if_range(client, digest):
+    etag = client.get(f"/media/{digest}/original").headers["etag"]
+
+    response = client.get(f"/media/{digest}/original", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+
+    response = client.get(f"/media/{digest}/original", headers={"Range": "bytes=0-9", "If-Range": '"outro"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+def test_get_media_not_modified(client, digest):
+    etag = client.get(f"/media/{digest}/original").headers["etag"]
+    response = client.get(f"/media/{digest}/original", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+@pytest.mark.parametrize("path", [
+    "/media/{digest}/preview.jpg",  # Variante ainda não gerada
+    "/media/{digest}/secret.txt",
+    "/media/../original",
+    "/media/abc/original",
+])
+def test_get_media_not_found(client, digest, path):
+    assert client.get(path.format(digest=digest)).status_code == 404
+
+@pytest.fixture
+def mirror_pool(monkeypatch):
+    # Threads no lugar do pool de processos: mesmo código, sem fork no teste
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(media, "_pool", pool)
+    yield pool
+    pool.shutdown(wait=True)
+
+def test_failed_mirror_returns_gone_then_retry(client, tmp_path, monkeypatch, mirror_pool):
+    Image = pytest.importorskip("PIL.Image")
+    output_url = "https://replicate.delivery/test/failed.png"
+    digest = media_key(output_url)
+
+    async def failing_download(url):
+        raise OSError("conexão recusada")
+
+    monkeypatch.setattr(inference, "download", failing_download)
+    asyncio.run(media.mirror_output(output_url))
+
+    assert media.media_failed(digest)
+    response = client.get(f"/media/{digest}/original")
+    assert response.status_code == 410
+    assert client.get(f"/media/{digest}/thumbnail.jpg").status_code == 410
+    assert client.get(f"/media/{digest[::-1]}/original").status_code == 404
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "red").save(buffer, format="PNG")
+
+    async def download(url):
+        return buffer.getvalue()
+
+    monkeypatch.setattr(inference, "download", download)
+    asyncio.run(media.mirror_output(output_url))
+
+    assert not media.media_failed(digest)
+    response = client.get(f"/media/{digest}/original")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert client.get(f"/media/{digest}/thumbnail.jpg").status_code == 200
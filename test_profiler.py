@@ -0,0 +1,80 @@
+"""
+Testes do profiler: filtro de threads ociosas e atribuição de threads no slow_ms
+"""
+import asyncio
+import threading
+import time
+
+from profiler import current_request, request_tracker, sample
+
+class Prediction:
+    """Imita replicate.Prediction.wait (polling com time.sleep)"""
+
+    def wait(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+def slow_work(seconds: float) -> None:
+    with request_tracker.thread_span():
+        time.sleep(seconds)
+
+def unrelated_work(seconds: float) -> None:
+    time.sleep(seconds)
+
+def start_thread(target, *args, name: str) -> threading.Thread:
+    thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+    thread.start()
+    return thread
+
+def test_library_wait_is_not_idle():
+    stop = threading.Event()
+    threads = [
+        start_thread(Prediction().wait, 0.5, name="polling"),
+        start_thread(stop.wait, 5, name="parada"),
+    ]
+    try:
+        collapsed, sample_count = sample(0.2, 0.01)
+        with_idle, _ = sample(0.05, 0.01, include_idle=True)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert sample_count > 0
+    assert "polling;" in collapsed
+    assert "wait (test_profiler.py" in collapsed
+    assert "parada;" not in collapsed
+    assert "parada;" in with_idle
+
+def test_slow_filter_keeps_only_request_threads():
+    async def handle_request() -> None:
+        request_id = request_tracker.request_started()
+        token = current_request.set(request_id)
+        try:
+            # asyncio.to_thread copia o contexto, como em InferencePool.run
+            await asyncio.to_thread(slow_work, 0.3)
+        finally:
+            request_tracker.request_finished(request_id)
+            current_request.reset(token)
+
+    threads = [
+        start_thread(asyncio.run, handle_request(), name="requisicao"),
+        start_thread(unrelated_work, 0.5, name="outra"),
+    ]
+    try:
+        collapsed, sample_count = sample(0.5, 0.01, slow_threshold=0.1)
+    finally:
+        for thread in threads:
+            thread.join()
+
+    assert sample_count > 0
+    assert "slow_work (test_profiler.py" in collapsed
+    assert "unrelated_work" not in collapsed
+
+    # Requisição mais rápida que o limite: nenhuma amostra
+    threads = [start_thread(asyncio.run, handle_request(), name="requisicao")]
+    try:
+        collapsed, sample_count = sample(0.5, 0.01, slow_threshold=1.0)
+    finally:
+        for thread in threads:
+            thread.join()
+    assert sample_count == 0
@@ -1,9 +1,119 @@
 """
 Funções auxiliares
 """
-from PIL import Image
 import io
 import os
+from typing import Optional
+from catalog import STYLE_PROMPTS, ROOM_PROMPTS, GARDEN_PROMPTS
+
+# Formatos aceitos no upload (únicos codecs do Pillow registrados)
+ACCEPTED_IMAGE_FORMATS = ("JPEG", "PNG", "WEBP")
+
+_pil_image = None
+_open_formats: tuple[str, ...] = ()
+
+def load_pil():
+    """
+    Importa o Pillow sob demanda registrando apenas JPEG, PNG e WebP
+
+    Evita carregar todos os plugins de formato no import e limita a
+    detecção de formato do Image.open aos codecs aceitos.
+    """
+    global _pil_image, _open_formats
+    if _pil_image is None:
+        from PIL import Image, JpegImagePlugin, PngImagePlugin, WebPImagePlugin  # noqa: F401
+
+        # Flag privada do Pillow (afeta o processo inteiro): preinit() retorna se
+        # _initialized >= 1 e init() se _initialized >= 2, então os demais plugins
+        # nunca são importados. Conferido no código do Pillow 9.x a 11.x
+        # (10.1.0 é a versão do requirements)
+        Image._initialized = 2
+
+        # Builds sem libwebp não registram "WEBP"; passar um formato ausente
+        # em `formats` faz o Image.open levantar KeyError
+        _open_formats = tuple(fmt for fmt in ACCEPTED_IMAGE_FORMATS if fmt in Image.OPEN)
+        _pil_image = Image
+    return _pil_image
+
+def open_image(image_bytes: bytes):
+    """Abre bytes de imagem aceitando apenas os formatos suportados"""
+    Image = load_pil()
+    return Image.open(io.BytesIO(image_bytes), formats=_open_formats)
+
+def process_pool(max_workers: int):
+    """
+    Cria um ProcessPoolExecutor seguro para processos com threads ativas
+
+    Usa "forkserver" (ou "spawn" onde não existe): fazer fork de um processo
+    com threads pode travar o filho em um lock herdado.
+
+    Args:
+        max_workers: Número de processos
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Verifica se o cabeçalho If-None-Match corresponde ao ETag atual
+
+    Args:
+        if_none_match: Valor do cabeçalho If-None-Match (pode ser lista ou "*")
+        etag: ETag atual do recurso
+
+    Returns:
+        True se o cliente já possui a versão atual (responder 304)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparação fraca (RFC 9110): ignora o prefixo W/
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+def parse_range(range_header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Interpreta um cabeçalho Range com um único intervalo de bytes
+
+    Args:
+        range_header: Valor do cabeçalho (ex: "bytes=0-1023", "bytes=500-", "bytes=-500")
+        size: Tamanho total do arquivo
+
+    Returns:
+        (start, end) inclusivo, ou None para servir o arquivo inteiro
+        (cabeçalho ausente, malformado ou com múltiplos intervalos)
+
+    Raises:
+        ValueError: Intervalo fora do arquivo (responder 416)
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_str, sep, end_str = (part.strip() for part in ranges.partition("-"))
+    if not sep or not (start_str or end_str):
+        return None
+    if (start_str and not start_str.isdigit()) or (end_str and not end_str.isdigit()):
+        return None
+
+    if not start_str:
+        # Sufixo: últimos N bytes
+        length = int(end_str)
+        if length == 0 or size == 0:
+            raise ValueError("Intervalo não satisfatível")
+        return max(0, size - length), size - 1
+
+    start = int(start_str)
+    if start >= size:
+        raise ValueError("Intervalo não satisfatível")
+    end = int(end_str) if end_str else size - 1
+    if end < start:
+        return None
+    return start, min(end, size - 1)
 
 def validate_image(image_bytes: bytes, max_size_bytes: int) -> tuple[bool, str]:
     """
@@ -23,7 +133,7 @@ def validate_image(image_bytes: bytes, max_size_bytes: int) -> tuple[bool, str]:
 
     # Verificar se é uma imagem válida
     try:
-        img = Image.open(io.BytesIO(image_bytes))
+        img = open_image(image_bytes)
         img.verify()
         return True, ""
     except Exception as e:
@@ -40,7 +150,8 @@ def optimize_image(image_bytes: bytes, max_dimension: int = 1024) -> bytes:
     Returns:
         Bytes da imagem otimizada
     """
-    img = Image.open(io.BytesIO(image_bytes))
+    Image = load_pil()
+    img = open_image(image_bytes)
 
     # Converter RGBA para RGB se necessário
     if img.mode == 'RGBA':
@@ -57,43 +168,9 @@ def optimize_image(image_bytes: bytes, max_dimension: int = 1024) -> bytes:
 
     return output.read()
 
-# Estilos expandidos com todos os novos
-STYLE_DESCRIPTIONS = {
-    "eclectic": "eclectic, mixed styles, diverse elements, unique combinations, artistic",
-    "modern": "modern, clean lines, neutral colors, contemporary furniture",
-    "minimalist": "minimalist, simple, white and wood tones, uncluttered",
-    "contemporary": "contemporary, sleek, sophisticated, mixed materials",
-    "scandinavian": "scandinavian, cozy, natural materials, bright and airy",
-    "mediterranean": "mediterranean, warm colors, terracotta, natural textures, coastal vibes",
-    "industrial": "industrial style, exposed brick, metal fixtures, concrete, raw materials",
-    "bohemian": "bohemian, colorful, eclectic, plants, textured fabrics, relaxed",
-    "rustic": "rustic, wooden elements, warm tones, natural textures",
-    "japanese_design": "japanese design, zen, minimalist, natural wood, tatami, shoji screens",
-    "arabic": "arabic, ornate patterns, rich colors, arches, mosaic tiles, luxurious textiles",
-    "futuristic": "futuristic, high-tech, sleek, metallic, LED lighting, cutting-edge design",
-    "luxurious": "luxurious, opulent, rich materials, elegant, high-end furnishings, sophisticated",
-    "retro": "retro, vintage inspired, bold colors, nostalgic elements, mid-century influences",
-    "professional": "professional, corporate, clean, organized, modern office aesthetic",
-    "vintage": "vintage, antique, classic pieces, timeless, traditional craftsmanship",
-    "eco_friendly": "eco-friendly, sustainable materials, natural, green, organic, recycled elements",
-    "gothic": "gothic, dark colors, dramatic, ornate details, Victorian influences, moody",
-    "traditional": "traditional, classic, elegant, rich colors",
-    "coastal": "coastal, beach inspired, light colors, natural light",
-    "midcentury": "mid-century modern, retro, clean lines, organic shapes"
-}
-
-# Room types expandidos
-ROOM_DESCRIPTIONS = {
-    "living_room": "living room",
-    "bedroom": "bedroom",
-    "bathroom": "bathroom",
-    "kitchen": "kitchen",
-    "dining_room": "dining room",
-    "home_office": "home office",
-    "study_room": "study room",
-    "office": "office",
-    "coworking": "coworking space"
-}
+# Descrições para prompts (fonte única em catalog.py)
+STYLE_DESCRIPTIONS = STYLE_PROMPTS
+ROOM_DESCRIPTIONS = ROOM_PROMPTS
 
 def build_prompt_interior(style: str, room_type: str) -> str:
     """
@@ -161,17 +238,7 @@ def build_prompt_garden(style: str, garden_type: str = "garden") -> str:
         Prompt formatado para máximo realismo fotográfico
     """
     style_desc = STYLE_DESCRIPTIONS.get(style.lower(), "modern")
-
-    garden_types = {
-        "garden": "garden",
-        "backyard": "backyard",
-        "front_yard": "front yard",
-        "patio": "patio",
-        "terrace": "terrace",
-        "rooftop": "rooftop garden"
-    }
-
-    garden_desc = garden_types.get(garden_type.lower(), "garden")
+    garden_desc = GARDEN_PROMPTS.get(garden_type.lower(), "garden")
 
     # Prompt ultra-direto focado em fotografia real
     prompt = (
@@ -199,3 +266,62 @@ def build_prompt_reference(room_type: str) -> str:
     prompt = f"{room_desc} interior design, match the style and aesthetic from reference image, apply color palette and design elements from reference, maintain room structure, professional interior design, photorealistic, high quality, well lit, 8k resolution"
 
     return prompt
+
+
+def build_input_interior(image, prompt: str) -> dict:
+    """
+    Parâmetros do modelo para redesign de interiores
+
+    Args:
+        image: Arquivo (file-like) da imagem otimizada
+        prompt: Prompt gerado por build_prompt_interior
+
+    Returns:
+        Dicionário de input para o Replicate
+    """
+    return {
+        "image": image,
+        "prompt": prompt,
+        "num_inference_steps": 35,  # Aumentado para melhor qualidade/definição
+        "guidance_scale": 9.5,  # Aumentado para mais fidelidade ao prompt fotorrealista
+        "strength": 0.6  # Fixo: balanceado para máximo realismo
+    }
+
+def build_input_exterior(image, prompt: str) -> dict:
+    """
+    Parâmetros do modelo para design de exterior (flux-canny-pro)
+
+    Args:
+        image: Arquivo (file-like) da imagem otimizada
+        prompt: Prompt gerado por build_prompt_exterior
+
+    Returns:
+        Dicionário de input para o Replicate
+    """
+    return {
+        "control_image": image,  # Canny usa control_image
+        "prompt": prompt,
+        "steps": 40,  # Passos de difusão (15-50, default 50)
+        "guidance": 7.5,  # Máximo para preservar estrutura (1-100)
+        "output_format": "jpg"
+    }
+
+def build_input_garden(image, prompt: str, strength: float = 0.35) -> dict:
+    """
+    Parâmetros do modelo para design de jardins
+
+    Args:
+        image: Arquivo (file-like) da imagem otimizada
+        prompt: Prompt gerado por build_prompt_garden
+        strength: Força da transformação
+
+    Returns:
+        Dicionário de input para o Replicate
+    """
+    return {
+        "image": image,
+        "prompt": prompt,
+        "num_inference_steps": 28,
+        "guidance_scale": 15.0,  # MUITO ALTO para forçar fotorrealismo
+        "strength": strength  # Default: 0.35 (ultra conservador)
+    }